@@ -4,16 +4,24 @@ Supports multiple image uploads, prompt templates, and customizable placeholders
 """
 
 import streamlit as st
-from google import genai
-from google.genai import types
-from PIL import Image
+import asyncio
+import hmac
 import io
+import logging
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# google.genai and PIL are imported lazily inside the code paths that need
+# them: they cost ~300-500 ms on cold start and the login screen doesn't
+# touch either. After the first import they're cached in sys.modules, so
+# the per-rerun cost is a dict lookup.
+
+logger = logging.getLogger(__name__)
 from templates import (
     get_template_names,
     get_template,
-    extract_placeholders,
+    get_placeholders,
     replace_placeholders
 )
 
@@ -25,19 +33,256 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Cache the pure template helpers: every keystroke triggers a full script
+# rerun, so without caching the regex extraction and replacement re-run on
+# each widget interaction
+get_template_names = st.cache_data(get_template_names)
+get_template = st.cache_data(get_template)
+replace_placeholders = st.cache_data(replace_placeholders)
+
 # Default password (you can change this)
 DEFAULT_PASSWORD = "imagegen2024"
 
+# Login screen markup, built once at import instead of on every rerun
+_LOGIN_HTML = """
+<div style="text-align: center; padding: 3rem 0;">
+    <h1 style="color: #667eea; font-size: 3rem;">🎨</h1>
+    <h2 style="color: #333;">AI Poster Generator</h2>
+    <p style="color: #666; font-size: 1.1rem;">Please enter the password to access the app</p>
+    <p style="color: #888; font-size: 0.95rem; margin-top: 1rem;">After login, click <strong>Generate</strong> to create posters for Jose J Chittilappilly</p>
+</div>
+"""
+
+# Placeholder form metadata, built once at import instead of re-running
+# if/elif chains on every rerun. _ICON_MAP is ordered by priority:
+# "Symbol Name" must match "symbol" before "name".
+_ICON_MAP = {
+    'panchayath': "📍",
+    'constituency': "📍",
+    'party': "🏛️",
+    'symbol': "🎯",
+    'tagline': "💬",
+    'name': "👤",
+}
+
+# placeholder -> (default value, help text)
+_PLACEHOLDER_DEFAULTS = {
+    "Panchayath/Constituency Name": (
+        "തൃശ്ശൂർ ജില്ലാ പഞ്ചായത്ത് മുരിയാട് ഡിവിഷൻ",
+        "Enter the panchayath/constituency name in Malayalam"
+    ),
+    "Candidate Name": (
+        "ജോസ് ജെ. ചിറ്റിലപ്പിള്ളി",
+        "Enter the candidate's name in Malayalam"
+    ),
+    "Symbol Name": (
+        "അരിവാൾ ചുറ്റിക നക്ഷത്രം",
+        "Enter the election symbol name in Malayalam"
+    ),
+    "Symbol Description": (
+        "അരിവാൾ ചുറ്റിക നക്ഷത്രം",
+        "Describe the symbol (e.g., hammer and sickle with star)"
+    ),
+    "Campaign Tagline": (
+        "വികസനത്തിനായി ജോസ് മാഷ്",
+        "Enter a catchy campaign tagline in Malayalam"
+    ),
+    "Party Name Initials": (
+        "LDF",
+        "Enter party initials (e.g., LDF, UDF, NDA)"
+    ),
+    "Full Party Name": (
+        "LDF",
+        "Enter the full party name"
+    ),
+}
+
+# Maximum number of in-flight Gemini calls (respects API rate limits)
+MAX_CONCURRENT_GENERATIONS = 5
+
+
+async def generate_posters(client, prompts, reference_images, config, on_part):
+    """
+    Stream one Gemini generation per prompt, all concurrently.
+
+    Uses the async streaming client so total latency is max(calls) instead
+    of sum(calls) when generating multiple posters, and network receive
+    overlaps UI updates: on_part is called for every response part as it
+    arrives instead of waiting for the full response. The coroutines run
+    on the script thread, so on_part may call Streamlit APIs. A semaphore
+    caps the number of in-flight requests to stay within Gemini rate
+    limits.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+    async def _generate(prompt):
+        async with semaphore:
+            stream = await client.aio.models.generate_content_stream(
+                model="gemini-3-pro-image-preview",
+                contents=[prompt] + reference_images,
+                config=config
+            )
+            async for chunk in stream:
+                # Walk every candidate, not just the first: with
+                # candidate_count > 1 one request carries all variants
+                for candidate in chunk.candidates or []:
+                    if candidate.content is None:
+                        continue
+                    for part in candidate.content.parts or []:
+                        on_part(part)
+
+    await asyncio.gather(*(_generate(p) for p in prompts))
+
+
+@st.cache_resource
+def load_default_images(directory, mtime):
+    """
+    Load the default reference images once per process.
+
+    Returns a dict mapping file path -> RGB PIL Image. Keyed by the
+    directory mtime so adding/removing files invalidates the cache;
+    avoids re-reading and re-decoding the images on every rerun.
+    """
+    from PIL import Image
+
+    # scandir hands back DirEntry objects with cached stat info, avoiding
+    # the per-entry join + extra stat that listdir would cost
+    paths = sorted(
+        entry.path
+        for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.rpartition('.')[2].lower() in {'png', 'jpg', 'jpeg'}
+    )
+    return {path: Image.open(path).convert('RGB') for path in paths}
+
+
+@st.cache_resource
+def open_uploaded_image(name, size, _file):
+    """
+    Decode an uploaded file to an RGB PIL Image once per process.
+
+    Keyed on (name, size) with the file object excluded from hashing via
+    the leading underscore. Both the thumbnail display and the generation
+    path reuse the single decoded copy instead of each running a full
+    decode per rerun.
+    """
+    from PIL import Image
+
+    _file.seek(0)
+    image = Image.open(_file)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+@st.cache_data
+def uploaded_thumbnail(name, size, _file):
+    """
+    Return JPEG thumbnail bytes for an uploaded file.
+
+    Keyed on (name, size) so reruns reuse the cached bytes. Copies the
+    shared decoded image before thumbnail() mutates it.
+    """
+    from PIL import Image
+
+    image = open_uploaded_image(name, size, _file).copy()
+    image.thumbnail((512, 512), Image.LANCZOS)
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=85)
+    return buf.getvalue()
+
+
+@st.cache_data
+def webp_download_bytes(img_bytes):
+    """
+    Re-encode generated image bytes to WebP for download.
+
+    Posters compress 2-3x smaller as WebP q=95 than the PNG Gemini
+    returns, which matters because the payload ships to the browser over
+    the WebSocket. Cached so the encode runs once per image, not per
+    rerun.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(img_bytes))
+    buf = io.BytesIO()
+    image.save(buf, format='WEBP', lossless=False, quality=95, method=4)
+    return buf.getvalue()
+
+
+def render_gallery(images):
+    """
+    Display generated images with their download buttons.
+
+    Shared between the fresh-generation and previous-generation branches.
+    Each image is persisted to disk once (UUID filename, failsafe) with the
+    path remembered in session state, so reruns reuse the existing file
+    instead of writing a fresh PNG per image on every interaction.
+    """
+    saved_paths = st.session_state.setdefault('saved_image_paths', {})
+
+    for idx, img_bytes in enumerate(images):
+        try:
+            st.image(img_bytes, caption=f"Generated Poster {idx + 1}", width="stretch")
+
+            try:
+                # Persist once per image; the stored bytes are already
+                # encoded, so no re-encode is needed for disk or download
+                if idx not in saved_paths:
+                    filename = f"{uuid.uuid4()}.png"
+                    with open(filename, 'wb') as f:
+                        f.write(img_bytes)
+                    saved_paths[idx] = filename
+                    logger.debug("Saved image to: %s", filename)
+
+                st.download_button(
+                    label=f"⬇️ Download Image {idx + 1}",
+                    data=webp_download_bytes(img_bytes),
+                    file_name=f"generated_poster_{idx + 1}.webp",
+                    mime="image/webp",
+                    use_container_width=True,
+                    key=f"download_{idx}"
+                )
+            except Exception as save_error:
+                logger.error("Failed to save image %d: %s", idx + 1, save_error)
+                st.error(f"Could not create download for image {idx + 1}: {save_error}")
+
+        except Exception as display_error:
+            logger.error("Failed to display image %d: %s", idx + 1, display_error)
+            st.error(f"Could not display image {idx + 1}: {display_error}")
+
+
+def reset_prompt_editor():
+    """Drop the edited prompt so the new template's preview reseeds it."""
+    st.session_state.pop("final_prompt_editor", None)
+    st.session_state.pop("_prompt_cache", None)
+
+def _get_external_api_key():
+    """
+    Return (key, source) from Streamlit secrets or the environment.
+
+    Single code path for both lookups; called once per rerun so st.secrets
+    (which takes a lock and parses TOML on first access) isn't hit twice.
+    """
+    try:
+        key = st.secrets.get("GEMINI_API_KEY", "")
+        if key:
+            return key, "Streamlit secrets"
+    except (FileNotFoundError, KeyError):
+        pass
+    key = os.getenv("GEMINI_API_KEY", "")
+    if key:
+        return key, "environment variable"
+    return "", ""
+
+
+# Externally-configured API key, read once per rerun
+_external_api_key, _external_api_key_source = _get_external_api_key()
+
 # Initialize session state
 if 'generated_images' not in st.session_state:
     st.session_state.generated_images = []
 if 'api_key' not in st.session_state:
-    # Try to load API key from Streamlit secrets first, then environment variable
-    try:
-        st.session_state.api_key = st.secrets.get("GEMINI_API_KEY", "")
-    except (FileNotFoundError, KeyError):
-        # Fall back to environment variable if secrets not configured
-        st.session_state.api_key = os.getenv("GEMINI_API_KEY", "")
+    st.session_state.api_key = _external_api_key
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 
@@ -47,14 +292,7 @@ def check_password():
     
     if not st.session_state.authenticated:
         # Show login form
-        st.markdown("""
-        <div style="text-align: center; padding: 3rem 0;">
-            <h1 style="color: #667eea; font-size: 3rem;">🎨</h1>
-            <h2 style="color: #333;">AI Poster Generator</h2>
-            <p style="color: #666; font-size: 1.1rem;">Please enter the password to access the app</p>
-            <p style="color: #888; font-size: 0.95rem; margin-top: 1rem;">After login, click <strong>Generate</strong> to create posters for Jose J Chittilappilly</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_LOGIN_HTML, unsafe_allow_html=True)
         
         col1, col2, col3 = st.columns([1, 1, 1])
         with col2:
@@ -67,7 +305,9 @@ def check_password():
                 submit = st.form_submit_button("Login", type="primary", use_container_width=True)
             
             if submit:
-                if password == DEFAULT_PASSWORD:
+                # Constant-time compare to avoid timing leaks; encode both
+                # sides since compare_digest rejects non-ASCII str input
+                if hmac.compare_digest(password.encode("utf-8"), DEFAULT_PASSWORD.encode("utf-8")):
                     st.session_state.authenticated = True
                     st.rerun()
                 else:
@@ -82,65 +322,10 @@ def check_password():
 if not check_password():
     st.stop()
 
-# Custom CSS for better aesthetics
-st.markdown("""
-<style>
-    /* Main header styling */
-    .main-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-        text-align: center;
-        color: white;
-    }
-    .main-header h1 {
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    .main-header p {
-        font-size: 1.1rem;
-        opacity: 0.95;
-    }
-    
-    /* Section styling */
-    .section-header {
-        background: linear-gradient(90deg, #f093fb 0%, #f5576c 100%);
-        padding: 0.75rem 1.5rem;
-        border-radius: 8px;
-        color: white;
-        font-weight: 600;
-        margin: 1rem 0;
-    }
-    
-    /* Card styling */
-    .info-card {
-        background: #f8f9fa;
-        padding: 1.5rem;
-        border-radius: 10px;
-        border-left: 4px solid #667eea;
-        margin: 1rem 0;
-    }
-    
-    /* Success message styling */
-    .stSuccess {
-        background-color: #d4edda;
-        border-left: 4px solid #28a745;
-    }
-    
-    /* Button styling */
-    .stButton>button {
-        border-radius: 8px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-    }
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better aesthetics, served from static/app.css so the
+# browser caches it across reruns instead of receiving the full stylesheet
+# over the WebSocket on every script pass (requires server.enableStaticServing)
+st.markdown('<link rel="stylesheet" href="/app/static/app.css">', unsafe_allow_html=True)
 
 # Enhanced title and description
 st.markdown("""
@@ -157,22 +342,10 @@ with st.sidebar:
     # API Key input with info
     st.markdown("#### 🔑 API Key")
     
-    # Check if API key is from secrets or environment
-    api_key_from_external = False
-    api_key_source = ""
-    
-    try:
-        if st.secrets.get("GEMINI_API_KEY"):
-            api_key_from_external = True
-            api_key_source = "Streamlit secrets"
-    except (FileNotFoundError, KeyError):
-        if os.getenv("GEMINI_API_KEY"):
-            api_key_from_external = True
-            api_key_source = "environment variable"
-    
-    # Only show input field if API key is NOT from external source
-    if api_key_from_external:
-        st.success(f"✅ Configured via {api_key_source}")
+    # Only show input field if API key is NOT from an external source
+    # (secrets/environment, already resolved once at the top of the rerun)
+    if _external_api_key:
+        st.success(f"✅ Configured via {_external_api_key_source}")
     else:
         api_key = st.text_input(
             "API Key",
@@ -205,6 +378,14 @@ with st.sidebar:
         index=2,  # Default to 4K
         help="Higher resolution = better quality but slower generation"
     )
+
+    n_variants = st.number_input(
+        "🔢 Variants",
+        min_value=1,
+        max_value=4,
+        value=1,
+        help="Number of poster variants generated in a single request"
+    )
     
     st.divider()
     
@@ -236,7 +417,9 @@ with col1:
         "Choose your poster style",
         options=template_names,
         help="Choose a poster template",
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key="template_selector",
+        on_change=reset_prompt_editor
     )
     
     # Get the selected template
@@ -244,14 +427,18 @@ with col1:
     
     # Image upload in an expander for better organization
     with st.expander("📸 **Upload Reference Images**", expanded=False):
-        # Load default images from default_pics folder
+        # Load default images from default_pics folder (cached per mtime)
         default_pics_dir = "default_pics"
-        default_images = []
-        
-        if os.path.exists(default_pics_dir):
-            for filename in os.listdir(default_pics_dir):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    default_images.append(os.path.join(default_pics_dir, filename))
+
+        # getmtime doubles as the existence check — one stat instead of two
+        try:
+            default_image_cache = load_default_images(
+                default_pics_dir,
+                os.path.getmtime(default_pics_dir)
+            )
+        except FileNotFoundError:
+            default_image_cache = {}
+        default_images = list(default_image_cache)
         
         # Show info about default images
         if default_images and not st.session_state.get('uploaded_files_used', False):
@@ -279,17 +466,15 @@ with col1:
             cols = st.columns(min(len(images_to_use), 3))
             for idx, file in enumerate(list(images_to_use)[:3]):  # Show max 3 thumbnails
                 with cols[idx]:
-                    if isinstance(file, str):  # Default image path
-                        image = Image.open(file)
-                        st.image(image, caption=os.path.basename(file), use_container_width=True)
-                    else:  # Uploaded file
-                        image = Image.open(file)
-                        st.image(image, caption=file.name, use_container_width=True)
+                    if isinstance(file, str):  # Default image path (cached)
+                        st.image(default_image_cache[file], caption=os.path.basename(file), use_container_width=True)
+                    else:  # Uploaded file (cached thumbnail bytes)
+                        st.image(uploaded_thumbnail(file.name, file.size, file), caption=file.name, use_container_width=True)
             if len(images_to_use) > 3:
                 st.info(f"➕ {len(images_to_use) - 3} more image(s)")
     
-    # Extract placeholders from template
-    placeholders = extract_placeholders(template)
+    # Placeholders for the selected template (precomputed at import)
+    placeholders = get_placeholders(selected_template)
     
     # Placeholder inputs in an expander
     with st.expander("✏️ **Fill in Campaign Details**", expanded=False):
@@ -299,49 +484,19 @@ with col1:
         for idx, placeholder in enumerate(placeholders):
             # Create a more user-friendly label
             label = placeholder.replace("_", " ").title()
-            
-            # Add emoji based on field type (check symbol before name!)
-            if "panchayath" in placeholder.lower() or "constituency" in placeholder.lower():
-                icon = "📍"
-            elif "party" in placeholder.lower():
-                icon = "🏛️"
-            elif "symbol" in placeholder.lower():
-                icon = "🎯"
-            elif "tagline" in placeholder.lower():
-                icon = "💬"
-            elif "name" in placeholder.lower():
-                icon = "👤"
-            else:
-                icon = "📝"
-            
-            # Provide helpful defaults based on exact placeholder names
+
+            # Emoji by field type, then defaults by exact placeholder name —
+            # both single lookups against the module-level tables
             placeholder_lower = placeholder.lower()
-            
-            if placeholder == "Panchayath/Constituency Name":
-                help_text = "Enter the panchayath/constituency name in Malayalam"
-                default_value = "തൃശ്ശൂർ ജില്ലാ പഞ്ചായത്ത് മുരിയാട് ഡിവിഷൻ"
-            elif placeholder == "Candidate Name":
-                help_text = "Enter the candidate's name in Malayalam"
-                default_value = "ജോസ് ജെ. ചിറ്റിലപ്പിള്ളി"
-            elif placeholder == "Symbol Name":
-                help_text = "Enter the election symbol name in Malayalam"
-                default_value = "അരിവാൾ ചുറ്റിക നക്ഷത്രം"
-            elif placeholder == "Symbol Description":
-                help_text = "Describe the symbol (e.g., hammer and sickle with star)"
-                default_value = "അരിവാൾ ചുറ്റിക നക്ഷത്രം"
-            elif placeholder == "Campaign Tagline":
-                help_text = "Enter a catchy campaign tagline in Malayalam"
-                default_value = "വികസനത്തിനായി ജോസ് മാഷ്"
-            elif placeholder == "Party Name Initials":
-                help_text = "Enter party initials (e.g., LDF, UDF, NDA)"
-                default_value = "LDF"
-            elif placeholder == "Full Party Name":
-                help_text = "Enter the full party name"
-                default_value = "LDF"
-            else:
-                help_text = f"Enter value for {label}"
-                default_value = ""
-            
+            icon = next(
+                (emoji for key, emoji in _ICON_MAP.items() if key in placeholder_lower),
+                "📝"
+            )
+            default_value, help_text = _PLACEHOLDER_DEFAULTS.get(
+                placeholder,
+                ("", f"Enter value for {label}")
+            )
+
             value = st.text_input(
                 f"{icon} {label}",
                 value=default_value,
@@ -355,16 +510,25 @@ with col1:
     with st.expander("📝 **Final Prompt Preview**", expanded=False):
         st.caption("✨ Review and edit the prompt before generating")
         
-        # Replace placeholders to show preview
-        preview_prompt = replace_placeholders(template, placeholder_values)
-        
-        # Editable text area for the final prompt
-        # Use template name in key so it resets when template changes
+        # Recompute the preview only when the template or the placeholder
+        # values actually changed — not on every keystroke in unrelated
+        # widgets
+        prompt_key = hash((selected_template, tuple(sorted(placeholder_values.items()))))
+        cached = st.session_state.get('_prompt_cache')
+        if cached is None or cached[0] != prompt_key:
+            preview_prompt = replace_placeholders(template, placeholder_values)
+            st.session_state._prompt_cache = (prompt_key, preview_prompt)
+        else:
+            preview_prompt = cached[1]
+
+        # Editable text area for the final prompt. A single fixed key keeps
+        # session_state from growing a new slot per template switch; the
+        # selectbox's on_change callback clears it when the template changes
         final_prompt_edited = st.text_area(
             "Edit Prompt (optional)",
             value=preview_prompt,
             height=300,
-            key=f"final_prompt_editor_{selected_template}",
+            key="final_prompt_editor",
             help="You can edit the prompt here before generating the image",
             label_visibility="collapsed"
         )
@@ -388,121 +552,128 @@ with col2:
         else:
             try:
                 with st.spinner("Generating image... This may take a moment."):
+                    from google import genai
+                    from google.genai import types
+                    from PIL import Image
+
                     # Use the edited prompt from the text area
                     final_prompt = final_prompt_edited
-                    
+
                     # Initialize Gemini client
                     client = genai.Client(api_key=st.session_state.api_key)
                     
-                    # Prepare content list
-                    content = [final_prompt]
-                    
-                    # Add images (uploaded or default)
-                    for img_file in images_to_use:
-                        if isinstance(img_file, str):  # Default image path
-                            image = Image.open(img_file)
+                    def prep_reference(img_file):
+                        """Turn one reference (path or upload) into an API Part."""
+                        if isinstance(img_file, str):  # Default image path (cached)
+                            image = default_image_cache[img_file]
                         else:  # Uploaded file
-                            # Reset file pointer
-                            img_file.seek(0)
-                            image = Image.open(img_file)
-                        
-                        # Convert to RGB if necessary (handles RGBA, grayscale, etc.)
-                        if image.mode != 'RGB':
-                            image = image.convert('RGB')
-                        content.append(image)
-                    
-                    # Generate image
-                    response = client.models.generate_content(
-                        model="gemini-3-pro-image-preview",
-                        contents=content,
-                        config=types.GenerateContentConfig(
-                            response_modalities=['TEXT', 'IMAGE'],
-                            image_config=types.ImageConfig(
-                                aspect_ratio=aspect_ratio,
-                                image_size=resolution
-                            ),
-                        )
-                    )
-                    
-                    # Debug: Print response structure
-                    print("=" * 50)
-                    print("GEMINI API RESPONSE DEBUG")
-                    print("=" * 50)
-                    print(f"Response type: {type(response)}")
-                    print(f"Response parts count: {len(response.parts)}")
-                    
-                    # Process response
+                            # Fast path: small JPEG/PNG uploads go to the API
+                            # as-is — skips a full decode + re-encode round-trip
+                            data = img_file.getvalue()
+                            if img_file.type in ('image/jpeg', 'image/png') and len(data) < 2_000_000:
+                                return types.Part.from_bytes(data=data, mime_type=img_file.type)
+                            # Fall back to the cached decode (already RGB)
+                            # when we need to downscale or flatten the mode
+                            image = open_uploaded_image(img_file.name, img_file.size, img_file)
+
+                        # Downscale to max-edge 1024 before upload — Gemini
+                        # doesn't need full-resolution phone photos, and large
+                        # uploads can trip the per-image payload limit.
+                        # Copy first: cached images are shared and
+                        # thumbnail() mutates in place.
+                        scratch = None
+                        if max(image.size) > 1024:
+                            scratch = image = image.copy()
+                            image.thumbnail((1024, 1024), Image.LANCZOS)
+
+                        # Send compact JPEG bytes instead of a PIL object to
+                        # cut the base64 payload the SDK has to serialize
+                        buf = io.BytesIO()
+                        image.save(buf, format='JPEG', quality=90)
+                        part = types.Part.from_bytes(data=buf.getvalue(), mime_type='image/jpeg')
+
+                        # Release the scratch pixel buffer right away so only
+                        # the compact JPEG bytes stay live during the multi-
+                        # second network wait (cached images remain owned by
+                        # their caches)
+                        if scratch is not None:
+                            scratch.close()
+                        return part
+
+                    # Prepare reference images in parallel — Pillow releases
+                    # the GIL during decode/resize, so threads overlap the
+                    # per-image work instead of paying it serially
+                    with ThreadPoolExecutor(max_workers=min(len(images_to_use), 4)) as executor:
+                        reference_images = list(executor.map(prep_reference, images_to_use))
+
+                    # Results are streamed into these as parts arrive
                     st.session_state.generated_images = []
+                    st.session_state.saved_image_paths = {}
                     text_response = []
-                    
-                    for idx, part in enumerate(response.parts):
-                        print(f"\n--- Part {idx} ---")
-                        print(f"Part type: {type(part)}")
-                        print(f"Has text: {part.text is not None}")
-                        
+                    progress = st.empty()
+
+                    def handle_part(part):
+                        # Gate debug formatting so production runs skip it
+                        debug = logger.isEnabledFor(logging.DEBUG)
+                        if debug:
+                            logger.debug("Streamed part %s (has_text=%s)", type(part), part.text is not None)
+
                         if part.text is not None:
-                            print(f"Text content: {part.text[:100]}...")
+                            if debug:
+                                logger.debug("Text content: %.100s...", part.text)
                             text_response.append(part.text)
-                        else:
-                            print("Attempting to get image...")
-                            gemini_image = part.as_image()
-                            if gemini_image:
-                                print(f"Gemini Image type: {type(gemini_image)}")
-                                
-                                try:
-                                    # Convert google.genai.types.Image to PIL Image
-                                    # The Gemini Image object has image_bytes attribute
-                                    if hasattr(gemini_image, 'image_bytes') and gemini_image.image_bytes:
-                                        pil_image = Image.open(io.BytesIO(gemini_image.image_bytes))
-                                        print(f"Converted to PIL Image: {type(pil_image)}")
-                                        print(f"PIL Image mode: {pil_image.mode}, size: {pil_image.size}")
-                                        st.session_state.generated_images.append(pil_image)
-                                    else:
-                                        print("ERROR: No image_bytes found in Gemini Image object")
-                                except Exception as e:
-                                    print(f"ERROR converting Gemini Image to PIL: {e}")
-                                    import traceback
-                                    traceback.print_exc()
+                            return
 
-                    
-                    print("=" * 50)
+                        gemini_image = part.as_image()
+                        if not gemini_image:
+                            return
+
+                        try:
+                            # Keep the already-encoded bytes — st.image and
+                            # st.download_button both accept bytes directly,
+                            # so skip the PIL decode and hold ~10x less RAM
+                            # per session than decoded RGB buffers
+                            if hasattr(gemini_image, 'image_bytes') and gemini_image.image_bytes:
+                                if debug:
+                                    logger.debug("Image bytes: %d", len(gemini_image.image_bytes))
+                                st.session_state.generated_images.append(gemini_image.image_bytes)
+                                # Show partial progress while the rest streams in
+                                progress.image(
+                                    gemini_image.image_bytes,
+                                    caption=f"Generated Poster {len(st.session_state.generated_images)}",
+                                    width="stretch"
+                                )
+                            else:
+                                logger.error("No image_bytes found in Gemini Image object")
+                        except Exception:
+                            logger.exception("Failed to read Gemini Image bytes")
+
+                    # Generate image(s) concurrently, streaming parts into the UI
+                    asyncio.run(generate_posters(
+                        client,
+                        [final_prompt],
+                        reference_images,
+                        types.GenerateContentConfig(
+                            response_modalities=['TEXT', 'IMAGE'],
+                            # One request returns all variants — amortizes the
+                            # handshake and prompt encoding across N outputs
+                            candidate_count=int(n_variants),
+                            image_config=types.ImageConfig(
+                                aspect_ratio=aspect_ratio,
+                                image_size=resolution
+                            ),
+                        ),
+                        handle_part
+                    ))
+                    progress.empty()
 
                     
                     # Display results
                     if st.session_state.generated_images:
                         st.success("✅ Image generated successfully!")
-                        
-                        for idx, img in enumerate(st.session_state.generated_images):
-                            try:
-                                st.image(img, caption=f"Generated Poster {idx + 1}", width="stretch")
-                                
-                                # Save to disk with UUID filename (failsafe)
-                                try:
-                                    image_uuid = str(uuid.uuid4())
-                                    filename = f"{image_uuid}.png"
-                                    img.save(filename)
-                                    print(f"✓ Saved image to: {filename}")
-                                    
-                                    # Read the saved file for download button
-                                    with open(filename, 'rb') as f:
-                                        byte_im = f.read()
-                                    
-                                    st.download_button(
-                                        label=f"⬇️ Download Image {idx + 1}",
-                                        data=byte_im,
-                                        file_name=f"generated_poster_{idx + 1}.png",
-                                        mime="image/png",
-                                        use_container_width=True
-                                    )
-                                except Exception as save_error:
-                                    print(f"ERROR saving image {idx + 1}: {save_error}")
-                                    st.error(f"Could not create download for image {idx + 1}: {save_error}")
-                                    
-                            except Exception as display_error:
-                                print(f"ERROR displaying image {idx + 1}: {display_error}")
-                                st.error(f"Could not display image {idx + 1}: {display_error}")
+                        render_gallery(st.session_state.generated_images)
+
 
-                    
                     if text_response:
                         with st.expander("📝 AI Response Text"):
                             st.write("\n\n".join(text_response))
@@ -517,35 +688,7 @@ with col2:
     # Display previously generated images
     elif st.session_state.generated_images:
         st.info("Previous generation:")
-        for idx, img in enumerate(st.session_state.generated_images):
-            try:
-                st.image(img, caption=f"Generated Poster {idx + 1}", width="stretch")
-                
-                # Save to disk with UUID filename (failsafe)
-                try:
-                    image_uuid = str(uuid.uuid4())
-                    filename = f"{image_uuid}.png"
-                    img.save(filename)
-                    
-                    # Read the saved file for download button
-                    with open(filename, 'rb') as f:
-                        byte_im = f.read()
-                    
-                    st.download_button(
-                        label=f"⬇️ Download Image {idx + 1}",
-                        data=byte_im,
-                        file_name=f"generated_poster_{idx + 1}.png",
-                        mime="image/png",
-                        use_container_width=True,
-                        key=f"download_{idx}"
-                    )
-                except Exception as save_error:
-                    print(f"ERROR saving previous image {idx + 1}: {save_error}")
-                    st.error(f"Could not create download for image {idx + 1}: {save_error}")
-                    
-            except Exception as display_error:
-                print(f"ERROR displaying previous image {idx + 1}: {display_error}")
-                st.error(f"Could not display image {idx + 1}: {display_error}")
+        render_gallery(st.session_state.generated_images)
 
 # Footer
 st.divider()
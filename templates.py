@@ -4,111 +4,37 @@ Each template contains placeholders in square brackets [placeholder_name]
 """
 
 import re
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
-# Template definitions
-TEMPLATES = {
-    "Male Candidate - Regular Photo": """Create a 4:5 poster in 4K resolution for a Kerala Local Body Election Campaign, using the uploaded candidate photo.
-
-Candidate Instructions
-
-Recreate the same person from the uploaded reference photo with 100% accurate facial identity. Show the candidate standing, wearing a light blue shirt (full sleeves folded to half) and a Kerala mundu. Expression: pleasant, clean, well-groomed, matching the face in the reference. Main pose: candidate waving his hand.
-
-Style: youthful, trendy, modern Kerala election design.
-
-Poster Layout & Design
-
-Follow Malayalam political-poster aesthetics.
-
-Use clear Malayalam typography.
-
-Do NOT show any labels.
-
-All text must be in Malayalam.
-
-Add the following Malayalam text exactly as specified order:
-
-1. Subheading (Regular font, lesser size than title):
-
-[Panchayath/Constituency Name] 
-
-2. Title (Bold, with breathing space above and below):
-
-[Candidate Name]
-
-3. Floating Headline 2 (Condensed sans-serif, lesser size than title ):
-
-നമ്മുടെ [Party Name Initials] സ്ഥാനാർത്ഥിയെ [Symbol Name] അടയാളത്തിൽ വോട്ട് ചെയ്ത് വിജയിപ്പിക്കുക.
-
-4. side Floating tagline in stylish manner with calligraphic decorations, font size less than title, Italic, handwritten style:
-
-[Campaign Tagline]
-
-5. Bottom Footer Section
-
-Left side, Display Party Name: [Full Party Name]
-
-Right side Display Symbol line, in outlined rounded corner box:
-
-നമ്മുടെ ചിഹ്നം place one [Symbol Description] icon next to this text only
+# Placeholders look like [placeholder_name]; compiled once at import so
+# every call reuses the same pattern object instead of going through
+# re._compile's cache lookup
+_PLACEHOLDER_RE = re.compile(r'\[([^\]]+)\]')
 
-Design Instructions:
-Malayalam text must be beautifully typeset. Maintain a clean, real-world election poster look with minimal background. Gentle shadows. Add delicate shapes, soft gradients, and a calm, balanced trendy composition.""",
-
-    "Female Candidate - Regular Photo": """Create a 4:5 poster in 4K resolution for a Kerala Local Body Election Campaign, using the uploaded candidate photo.
+# Shared template fragments. The four templates differ only in the
+# candidate instructions, the subheading suffix and the design
+# instructions, so the common prose is stored once and the templates are
+# assembled at import — the assembled strings are byte-identical to the
+# previous inline literals.
+_POSTER_HEADER = """Create a 4:5 poster in 4K resolution for a Kerala Local Body Election Campaign, using the uploaded candidate photo.
 
 Candidate Instructions
 
-Recreate the same person from the uploaded reference photo with 100% accurate facial identity. Show the candidate standing and wearing a plain blue Indian saree typically used in election campaigning. The expression should be pleasant, confident, clean, and well-groomed, matching the look of the reference. The main pose should show the candidate waving her hand. Keep ornaments minimal—small earrings, a thin neck chain, one or two simple bangles, and a wristwatch.
-
-Poster Layout & Design
-
-Follow Malayalam political-poster aesthetics.
-
-Use clear Malayalam typography.
-
-Do NOT show any labels.
-
-All text must be in Malayalam.
-
-Add the following Malayalam text exactly as specified order:
-
-1. Subheading (Regular font, lesser size than title):
-
-[Panchayath/Constituency Name] ഗ്രാമ പഞ്ചായത്ത് ഒന്നാം വാർഡ് സ്ഥാനാർത്ഥി
-
-2. Title (Bold, with breathing space above and below):
-
-[Candidate Name]
-
-3. Floating Headline 2 (Condensed sans-serif, lesser size than title ):
-
-നമ്മുടെ [Party Name Initials] സ്ഥാനാർത്ഥിയെ [Symbol Name] അടയാളത്തിൽ വോട്ട് ചെയ്ത് വിജയിപ്പിക്കുക.
-
-4. side Floating tagline in stylish manner with calligraphic decorations, font size less than title, Italic, handwritten style:
-
-[Campaign Tagline]
-
-5. Bottom Footer Section
-
-Left side, Display Party Name: [Full Party Name]
-
-Right side Display Symbol line, in outlined rounded corner box:
-
-നമ്മുടെ ചിഹ്നം place one [Symbol Description] icon next to this text only
+"""
 
-Design Instructions:
-Malayalam text must be beautifully typeset. Maintain a clean, real-world election poster look with minimal background. Gentle shadows. Add delicate shapes, soft gradients, and a calm, balanced trendy composition.""",
+_MALE_CANDIDATE = """Recreate the same person from the uploaded reference photo with 100% accurate facial identity. Show the candidate standing, wearing a light blue shirt (full sleeves folded to half) and a Kerala mundu. Expression: pleasant, clean, well-groomed, matching the face in the reference. Main pose: candidate waving his hand.
 
-    "Male Candidate - Caricature Style": """Create a 4:5 poster in 4K resolution for a Kerala Local Body Election Campaign, using the uploaded candidate photo.
+Style: youthful, trendy, modern Kerala election design.
 
-Candidate Instructions
+"""
 
-Recreate the same person from the uploaded reference photo with 100% accurate facial identity. Show the candidate standing, wearing a light blue shirt (full sleeves folded to half) and a Kerala mundu. Expression: pleasant, clean, well-groomed, matching the face in the reference. Main pose: candidate waving his hand.
+_FEMALE_CANDIDATE = """Recreate the same person from the uploaded reference photo with 100% accurate facial identity. Show the candidate standing and wearing a plain blue Indian saree typically used in election campaigning. The expression should be pleasant, confident, clean, and well-groomed, matching the look of the reference. The main pose should show the candidate waving her hand. Keep ornaments minimal—small earrings, a thin neck chain, one or two simple bangles, and a wristwatch.
 
-Style: youthful, trendy, modern Kerala election design.
+"""
 
-Poster Layout & Design
+# {subheading_suffix} is the only per-template variation inside the layout
+_LAYOUT_BLOCK = """Poster Layout & Design
 
 Follow Malayalam political-poster aesthetics.
 
@@ -122,7 +48,7 @@ Add the following Malayalam text exactly as specified order:
 
 1. Subheading (Regular font, lesser size than title):
 
-[Panchayath/Constituency Name] സ്ഥാനാർത്ഥി
+[Panchayath/Constituency Name]{subheading_suffix}
 
 2. Title (Bold, with breathing space above and below):
 
@@ -144,103 +70,169 @@ Right side Display Symbol line, in outlined rounded corner box:
 
 നമ്മുടെ ചിഹ്നം place one [Symbol Description] icon next to this text only
 
-Design Instructions
-
-Caricature-style election poster with a clean, polished, cartoonish illustration of the candidate. Use a minimal real-world election poster aesthetic with smooth lighting and gentle, natural shadows. All Malayalam text must be beautifully typeset, with modern political-poster typography. Use a calm, balanced layout with soft gradients, delicate abstract shapes, and thoughtfully used negative space. Maintain a youthful, trendy composition without clutter.""",
-
-    "Female Candidate - Caricature Style": """Create a 4:5 poster in 4K resolution for a Kerala Local Body Election Campaign, using the uploaded candidate photo.
-
-Candidate Instructions
-
-Recreate the same person from the uploaded reference photo with 100% accurate facial identity. Show the candidate standing and wearing a plain blue Indian saree typically used in election campaigning. The expression should be pleasant, confident, clean, and well-groomed, matching the look of the reference. The main pose should show the candidate waving her hand. Keep ornaments minimal—small earrings, a thin neck chain, one or two simple bangles, and a wristwatch.
-
-Poster Layout & Design
-
-Follow Malayalam political-poster aesthetics.
+"""
 
-Use clear Malayalam typography.
+_DESIGN_REGULAR = """Design Instructions:
+Malayalam text must be beautifully typeset. Maintain a clean, real-world election poster look with minimal background. Gentle shadows. Add delicate shapes, soft gradients, and a calm, balanced trendy composition."""
 
-Do NOT show any labels.
+_DESIGN_CARICATURE = """Design Instructions
 
-All text must be in Malayalam.
-
-Add the following Malayalam text exactly as specified order:
+Caricature-style election poster with a clean, polished, cartoonish illustration of the candidate. Use a minimal real-world election poster aesthetic with smooth lighting and gentle, natural shadows. All Malayalam text must be beautifully typeset, with modern political-poster typography. Use a calm, balanced layout with soft gradients, delicate abstract shapes, and thoughtfully used negative space. Maintain a youthful, trendy composition without clutter."""
 
-1. Subheading (Regular font, lesser size than title):
+# Template definitions, assembled from the shared fragments
+TEMPLATES = {
+    "Male Candidate - Regular Photo": (
+        _POSTER_HEADER
+        + _MALE_CANDIDATE
+        + _LAYOUT_BLOCK.format(subheading_suffix=" ")
+        + _DESIGN_REGULAR
+    ),
+
+    "Female Candidate - Regular Photo": (
+        _POSTER_HEADER
+        + _FEMALE_CANDIDATE
+        + _LAYOUT_BLOCK.format(subheading_suffix=" ഗ്രാമ പഞ്ചായത്ത് ഒന്നാം വാർഡ് സ്ഥാനാർത്ഥി")
+        + _DESIGN_REGULAR
+    ),
+
+    "Male Candidate - Caricature Style": (
+        _POSTER_HEADER
+        + _MALE_CANDIDATE
+        + _LAYOUT_BLOCK.format(subheading_suffix=" സ്ഥാനാർത്ഥി")
+        + _DESIGN_CARICATURE
+    ),
+
+    "Female Candidate - Caricature Style": (
+        _POSTER_HEADER
+        + _FEMALE_CANDIDATE
+        + _LAYOUT_BLOCK.format(subheading_suffix=" ഗ്രാമ പഞ്ചായത്ത് ഒന്നാം വാർഡ് സ്ഥാനാർത്ഥി")
+        + _DESIGN_CARICATURE
+    )
+}
 
-[Panchayath/Constituency Name] ഗ്രാമ പഞ്ചായത്ത് ഒന്നാം വാർഡ് സ്ഥാനാർത്ഥി
 
-2. Title (Bold, with breathing space above and below):
+@lru_cache(maxsize=None)
+def extract_placeholders(template: str) -> Tuple[str, ...]:
+    """
+    Extract all placeholders from a template.
+    Placeholders are in the format [placeholder_name]
 
-[Candidate Name]
+    Memoized: the function is pure and in practice only ever sees the
+    handful of strings in TEMPLATES, so repeat calls become a dict lookup
+    instead of a regex scan. Returns an immutable tuple so callers can't
+    mutate the shared cached value.
 
-3. Floating Headline 2 (Condensed sans-serif, lesser size than title ):
-
-നമ്മുടെ [Party Name Initials] സ്ഥാനാർത്ഥിയെ [Symbol Name] അടയാളത്തിൽ വോട്ട് ചെയ്ത് വിജയിപ്പിക്കുക.
+    Args:
+        template: The template string
 
-4. side Floating tagline in stylish manner with calligraphic decorations, font size less than title, Italic, handwritten style:
+    Returns:
+        Tuple of unique placeholder names
+    """
+    # dict.fromkeys dedupes while preserving insertion order, entirely in C
+    return tuple(dict.fromkeys(_PLACEHOLDER_RE.findall(template)))
 
-[Campaign Tagline]
 
-5. Bottom Footer Section
+# Template names frozen once at import so get_template_names is
+# allocation-free
+_TEMPLATE_NAMES: Tuple[str, ...] = tuple(TEMPLATES)
 
-Left side, Display Party Name: [Full Party Name]
+# Placeholder lists resolved once at import so the request path is a
+# single dict lookup; the frozenset form gives O(1) membership tests
+# during validation
+TEMPLATE_PLACEHOLDERS: Dict[str, Tuple[str, ...]] = {
+    name: extract_placeholders(text) for name, text in TEMPLATES.items()
+}
+TEMPLATE_PLACEHOLDER_SETS = {
+    name: frozenset(placeholders)
+    for name, placeholders in TEMPLATE_PLACEHOLDERS.items()
+}
 
-Right side Display Symbol line, in outlined rounded corner box:
 
-നമ്മുടെ ചിഹ്നം place one [Symbol Description] icon next to this text only
+def get_placeholders(name: str) -> Tuple[str, ...]:
+    """Get the precomputed placeholder tuple for a template name"""
+    return TEMPLATE_PLACEHOLDERS[name]
 
-Design Instructions
 
-Caricature-style election poster with a clean, polished, cartoonish illustration of the candidate. Use a minimal real-world election poster aesthetic with smooth lighting and gentle, natural shadows. All Malayalam text must be beautifully typeset, with modern political-poster typography. Use a calm, balanced layout with soft gradients, delicate abstract shapes, and thoughtfully used negative space. Maintain a youthful, trendy composition without clutter."""
-}
+def replace_placeholders(template: str, values: Dict[str, str]) -> str:
+    """
+    Replace placeholders in template with provided values.
 
+    Single pass over the template: slices between matches and the
+    looked-up values are collected into a list and joined once, so there
+    is no per-match callback dispatch and str.join allocates the final
+    buffer exactly once. Placeholders without a value are left intact.
 
-def extract_placeholders(template: str) -> List[str]:
-    """
-    Extract all placeholders from a template.
-    Placeholders are in the format [placeholder_name]
-    
     Args:
-        template: The template string
-        
+        template: The template string with placeholders
+        values: Dictionary mapping placeholder names to their values
+
     Returns:
-        List of unique placeholder names
+        Template with placeholders replaced
+    """
+    # Every placeholder starts with '[', so its absence (or an empty
+    # values dict) guarantees a no-op — one C-level scan beats a full
+    # regex pass
+    if not values or '[' not in template:
+        return template
+
+    parts = []
+    last = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        parts.append(template[last:match.start()])
+        parts.append(values.get(match.group(1), match.group(0)))
+        last = match.end()
+    parts.append(template[last:])
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=128)
+def _render_cached(name: str, items: Tuple[Tuple[str, str], ...]) -> Tuple[str, Tuple[str, ...]]:
+    """Single-pass render keyed by (name, sorted value items)."""
+    values = dict(items)
+    template = TEMPLATES[name]
+    parts = []
+    missing = []
+    last = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        key = match.group(1)
+        parts.append(template[last:match.start()])
+        if key in values:
+            parts.append(values[key])
+        else:
+            parts.append(match.group(0))
+            if key not in missing:
+                missing.append(key)
+        last = match.end()
+    parts.append(template[last:])
+    return ''.join(parts), tuple(missing)
+
+
+def render(name: str, values: Dict[str, str]) -> Tuple[str, List[str]]:
     """
-    pattern = r'\[([^\]]+)\]'
-    placeholders = re.findall(pattern, template)
-    # Return unique placeholders while preserving order
-    seen = set()
-    unique_placeholders = []
-    for p in placeholders:
-        if p not in seen:
-            seen.add(p)
-            unique_placeholders.append(p)
-    return unique_placeholders
+    Render a template by name in a single pass.
 
+    Fuses substitution and validation: walks the placeholder matches
+    once, emitting output chunks and collecting any placeholders that
+    have no value, instead of running separate extract + replace passes.
+    Results are LRU-cached on (name, sorted value items), so re-rendering
+    with the same candidate data skips the scan entirely.
 
-def replace_placeholders(template: str, values: Dict[str, str]) -> str:
-    """
-    Replace placeholders in template with provided values.
-    
     Args:
-        template: The template string with placeholders
+        name: Template name (a TEMPLATES key)
         values: Dictionary mapping placeholder names to their values
-        
+
     Returns:
-        Template with placeholders replaced
+        Tuple of (rendered template, list of placeholders missing a value)
     """
-    result = template
-    for placeholder, value in values.items():
-        result = result.replace(f'[{placeholder}]', value)
-    return result
+    rendered, missing = _render_cached(name, tuple(sorted(values.items())))
+    return rendered, list(missing)
 
 
-def get_template_names() -> List[str]:
-    """Get list of all template names"""
-    return list(TEMPLATES.keys())
+def get_template_names() -> Tuple[str, ...]:
+    """Get all template names (precomputed, allocation-free)"""
+    return _TEMPLATE_NAMES
 
 
 def get_template(name: str) -> str:
-    """Get template by name"""
-    return TEMPLATES.get(name, "")
+    """Get template by name; raises KeyError for unknown names"""
+    return TEMPLATES[name]